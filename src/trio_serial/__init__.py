@@ -16,6 +16,8 @@ from typing import Type
 
 from .abstract import AbstractSerialStream, Parity, StopBits
 
+_BSD_PLATFORMS = ("bsd", "freebsd", "netbsd", "openbsd")
+
 if os.name == "posix":
     SerialStream: Type[AbstractSerialStream]
 
@@ -26,7 +28,7 @@ if os.name == "posix":
         from .cygwin import CygwinSerialStream as SerialStream
     elif plat.startswith("darwin"):
         from .darwin import DarwinSerialStream as SerialStream
-    elif any(plat.startswith(term) for term in ["bsd", "freebsd", "netbsd", "openbsd"]):
+    elif plat.startswith(_BSD_PLATFORMS):
         from .bsd import BsdSerialStream as SerialStream
     else:
         from .posix import PosixSerialStream as SerialStream
@@ -10,13 +10,17 @@ Public interface of trio-serial. Modules implement the OS specific parts.
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from contextlib import ExitStack
 from enum import Enum, auto
-from typing import ByteString, Optional
+from typing import ByteString, Iterable, Optional, Sequence, Tuple, Union
 
 import trio.lowlevel
-from trio._util import ConflictDetector
+from trio import BusyResourceError
 from trio.abc import Stream
 
+# Buffers that can be received into
+WritableBuffer = Union[bytearray, memoryview]
+
 
 class Parity(Enum):
     """
@@ -84,8 +88,8 @@ class AbstractSerialStream(Stream, ABC):
     _rtscts: bool
 
     # Guard against parallel recv or send on the port.
-    _recv_conflict_detector: ConflictDetector
-    _send_conflict_detector: ConflictDetector
+    _recv_busy: bool = False
+    _send_busy: bool = False
 
     def __init__(
         self,
@@ -121,12 +125,6 @@ class AbstractSerialStream(Stream, ABC):
         self._stopbits = stopbits
         self._xonxoff = xonxoff
         self._rtscts = rtscts
-        self._recv_conflict_detector = ConflictDetector(
-            "Another task is currently sending data on this SerialStream"
-        )
-        self._send_conflict_detector = ConflictDetector(
-            "Another task is currently receiving data on this SerialStream"
-        )
 
     async def __aenter__(self) -> AbstractSerialStream:
         """
@@ -139,11 +137,31 @@ class AbstractSerialStream(Stream, ABC):
         await self.aopen()
         return self
 
-    def __del__(self) -> None:
+    def _claim_recv(self) -> None:
         """
-        Destructor. Closes the port if still open.
+        Mark the stream as receiving. Reset :py:attr:`_recv_busy` when done.
+
+        Raises:
+            BusyResourceError: If another task is already receiving
         """
-        self._close()
+        if self._recv_busy:
+            raise BusyResourceError(
+                "Another task is currently receiving data on this SerialStream"
+            )
+        self._recv_busy = True
+
+    def _claim_send(self) -> None:
+        """
+        Mark the stream as sending. Reset :py:attr:`_send_busy` when done.
+
+        Raises:
+            BusyResourceError: If another task is already sending
+        """
+        if self._send_busy:
+            raise BusyResourceError(
+                "Another task is currently sending data on this SerialStream"
+            )
+        self._send_busy = True
 
     @property
     def port(self) -> str:
@@ -211,8 +229,36 @@ class AbstractSerialStream(Stream, ABC):
             On success, between 1 and :py:obj:`max_bytes` bytes.
             On End-of-file (e.g. serial port is gone) an empty bytes object is returned.
         """
-        with self._recv_conflict_detector:
+        self._claim_recv()
+        try:
             return bytes(await self._recv(max_bytes))
+        finally:
+            self._recv_busy = False
+
+    async def receive_into(self, buffer: WritableBuffer) -> int:
+        """
+        Receive some bytes from the serial port directly into :py:obj:`buffer`, without
+        allocating a new bytes object.
+
+        Args:
+            buffer: Writable buffer, e.g. a bytearray or memoryview. Its size in bytes is
+                    the maximum number of bytes to receive.
+
+        Returns:
+            On success, number of bytes received, at least 1.
+            On End-of-file (e.g. serial port is gone) 0 is returned.
+        """
+        # Backends get a flat byte view, so len() counts bytes whatever the item format.
+        with memoryview(buffer) as view, view.cast("B") as data:
+            if data.readonly:
+                raise TypeError("buffer must be writable")
+            if not data:
+                raise ValueError("buffer must not be empty")
+            self._claim_recv()
+            try:
+                return await self._recv_into(data)
+            finally:
+                self._recv_busy = False
 
     async def send_all(self, data: ByteString) -> None:
         """
@@ -220,23 +266,72 @@ class AbstractSerialStream(Stream, ABC):
         Args:
             data: Data to send
         """
-        with self._send_conflict_detector:
-            with memoryview(data) as data:
-                if not data:
+        self._claim_send()
+        try:
+            total_len = len(data)
+            if not total_len:
+                await trio.lowlevel.checkpoint()
+                return
+
+            # Most writes complete in one go; only wrap and slice after a partial write.
+            await self._wait_writable()
+            total_sent = await self._send(data)
+            if total_sent < total_len:
+                with memoryview(data) as view:
+                    while total_sent < total_len:
+                        await self._wait_writable()
+                        with view[total_sent:] as remaining:
+                            total_sent += await self._send(remaining)
+        finally:
+            self._send_busy = False
+
+    async def send_many(self, fragments: Iterable[ByteString]) -> None:
+        """
+        Send several buffers to the serial port, as if they were concatenated and passed
+        to :py:meth:`send_all`. Where supported they are written with a single system call,
+        e.g. header, payload and checksum of a frame, without joining them first.
+
+        Args:
+            fragments: Data to send, in order
+        """
+        self._claim_send()
+        try:
+            # Release every view when done, else the caller's buffers stay locked against
+            # resizing for as long as e.g. a traceback keeps them alive.
+            with ExitStack() as stack:
+                views = [
+                    stack.enter_context(stack.enter_context(memoryview(fragment)).cast("B"))
+                    for fragment in fragments
+                ]
+                views = [view for view in views if view]
+                if not views:
                     await trio.lowlevel.checkpoint()
-                total_sent = 0
-                while total_sent < len(data):
+                    return
+
+                while views:
                     await self._wait_writable()
-                    with data[total_sent:] as remaining:
-                        sent = await self._send(remaining)
-                        total_sent += sent
+                    sent = await self._sendv(views)
+
+                    # Drop the fragments which were sent completely, cut the partially sent one.
+                    done = 0
+                    while done < len(views) and sent >= len(views[done]):
+                        sent -= len(views[done])
+                        done += 1
+                    views = views[done:]
+                    if sent:
+                        views[0] = stack.enter_context(views[0][sent:])
+        finally:
+            self._send_busy = False
 
     async def wait_send_all_might_not_block(self) -> None:
         """
         Wait until sending might not block (it still might block).
         """
-        with self._send_conflict_detector:
+        self._claim_send()
+        try:
             await self._wait_writable()
+        finally:
+            self._send_busy = False
 
     @abstractmethod
     async def get_cts(self) -> bool:
@@ -256,6 +351,16 @@ class AbstractSerialStream(Stream, ABC):
             Current RTS state
         """
 
+    async def get_cts_rts(self) -> Tuple[bool, bool]:
+        """
+        Retrieve current *Clear To Send* and *Ready To Send* states together.
+        Implementations should override this to read both with a single call.
+
+        Returns:
+            Current CTS and RTS states
+        """
+        return await self.get_cts(), await self.get_rts()
+
     @abstractmethod
     async def set_rts(self, value: bool) -> None:
         """
@@ -294,14 +399,40 @@ class AbstractSerialStream(Stream, ABC):
             Received data
         """
 
+    async def _recv_into(self, buffer: WritableBuffer) -> int:
+        """
+        Retrieve up to ``len(buffer)`` bytes from the serial port into :py:obj:`buffer`.
+        Same blocking rules as :py:meth:`_recv`. Implementations should override this
+        to read into the buffer directly.
+
+        Returns:
+            Number of bytes received
+        """
+        data = await self._recv(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
     @abstractmethod
     async def _wait_writable(self) -> None:
         """
         Wait until serial port is writable.
         """
 
+    async def _sendv(self, buffers: Sequence[ByteString]) -> int:
+        """
+        Send several buffers to the serial port, in order. Partial writes are allowed.
+        Implementations should override this to write all buffers with one system call.
+
+        Args:
+            buffers: Bytes to write, at least one buffer.
+
+        Returns:
+            Number of bytes actually written.
+        """
+        return await self._send(buffers[0])
+
     @abstractmethod
-    async def _send(self, data: memoryview) -> int:
+    async def _send(self, data: ByteString) -> int:
         """
         Send :py:obj:`data` to the serial port. Partial writes are allowed.
 
@@ -15,11 +15,6 @@ from __future__ import annotations
 from .posix import PosixSerialStream
 
 
-class ReturnBaudrate:
-    def __getitem__(self, key: int) -> int:
-        return key
-
-
 class BsdSerialStream(PosixSerialStream):
     """
     BSD specific constants and functions
@@ -27,4 +22,4 @@ class BsdSerialStream(PosixSerialStream):
 
     # Only tested on FreeBSD:
     # The baud rate may be passed in as a literal value.
-    BAUDRATE_CONSTANTS = ReturnBaudrate()
+    LITERAL_BAUDRATES = True
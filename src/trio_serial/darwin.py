@@ -12,14 +12,24 @@ Darwin backend for trio-serial.
 
 from __future__ import annotations
 
-import array
 import fcntl
 import os
-
-from trio import ClosedResourceError
+from functools import lru_cache
+from struct import Struct
 
 from .posix import PosixSerialStream
 
+# speed_t argument of IOSSIOSPEED
+SPEED = Struct("@i")
+
+
+@lru_cache(maxsize=None)
+def osx_version() -> int:
+    """
+    Get the major Darwin kernel version, e.g. 8 for Tiger.
+    """
+    return int(os.uname().release.split(".")[0])
+
 
 class DarwinSerialStream(PosixSerialStream):
     """
@@ -27,15 +37,14 @@ class DarwinSerialStream(PosixSerialStream):
     """
 
     IOSSIOSPEED = 0x80045402  # _IOW('T', 2, speed_t)
-    osx_version = int(os.uname().release.split(".")[0])
-
-    # Tiger or above can support arbitrary serial speeds
-    if osx_version >= 8:
 
-        def _set_special_baudrate(self, fd: int) -> None:
-            """
-            Set custom baudrate
-            """
+    def _set_special_baudrate(self, fd: int) -> None:
+        """
+        Set custom baudrate
+        """
+        # Tiger or above can support arbitrary serial speeds
+        if osx_version() < 8:
+            super()._set_special_baudrate(fd)
+        else:
             # use IOKit-specific call to set up high speeds
-            buf = array.array("i", [self._baudrate])
-            fcntl.ioctl(fd, self.IOSSIOSPEED, buf, 1)
+            fcntl.ioctl(fd, self.IOSSIOSPEED, SPEED.pack(self._baudrate))
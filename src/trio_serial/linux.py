@@ -12,14 +12,15 @@ Linux backend for trio-serial.
 
 from __future__ import annotations
 
-import array
 import fcntl
 import termios
-
-from trio import ClosedResourceError
+from struct import Struct
 
 from .posix import PosixSerialStream
 
+# Kernel struct termios2: iflag, oflag, cflag, lflag, c_line + c_cc[19], ispeed, ospeed
+TERMIOS2 = Struct("@4I20s2I")
+
 
 class LinuxSerialStream(PosixSerialStream):
     """
@@ -73,18 +74,19 @@ class LinuxSerialStream(PosixSerialStream):
         """
         Set custom baudrate
         """
-        # right size is 44 on x86_64, allow for some growth
-        buf = array.array("i", [0] * 64)
+        buf = bytearray(TERMIOS2.size)
         try:
-            # get serial_struct
-            fcntl.ioctl(fd, self.TCGETS2, buf)
+            # get termios2
+            fcntl.ioctl(fd, self.TCGETS2, buf, True)
+            iflag, oflag, cflag, lflag, cc, _, _ = TERMIOS2.unpack(buf)
 
             # set custom speed
-            buf[2] &= ~termios.CBAUD
-            buf[2] |= self.BOTHER
-            buf[9] = buf[10] = self._baudrate
+            cflag = cflag & ~termios.CBAUD | self.BOTHER
+            TERMIOS2.pack_into(
+                buf, 0, iflag, oflag, cflag, lflag, cc, self._baudrate, self._baudrate
+            )
 
-            # set serial_struct
+            # set termios2
             fcntl.ioctl(fd, self.TCSETS2, buf)
         except IOError as ex:
             raise ValueError(f"Failed to set custom baud rate {self._baudrate}: {ex!s}")
@@ -13,28 +13,106 @@ POSIX backend for trio-serial.
 
 from __future__ import annotations
 
-import array
 import fcntl
 import os
 import termios
-from struct import pack, unpack
-from typing import ByteString, Dict, Optional
+import weakref
+from struct import Struct
+from typing import Any, ByteString, Dict, Optional, Sequence, Tuple
 
 import trio.lowlevel
 from trio import ClosedResourceError
 
-from .abstract import AbstractSerialStream, Parity, StopBits
+from .abstract import AbstractSerialStream, Parity, StopBits, WritableBuffer
 
+# Modem bits are passed to ioctl as native unsigned int
+UINT = Struct("@I")
+
+FIONREAD = getattr(termios, "FIONREAD", 0x541B)
 TIOCMGET = getattr(termios, "TIOCMGET", 0x5415)
 TIOCMBIS = getattr(termios, "TIOCMBIS", 0x5416)
 TIOCMBIC = getattr(termios, "TIOCMBIC", 0x5417)
-BUF_ZERO = pack("@I", 0)
+BUF_ZERO = UINT.pack(0)
 
 BIT_RTS = getattr(termios, "TIOCM_RTS", 0x004)
-BUF_RTS = pack("@I", BIT_RTS)
+BUF_RTS = UINT.pack(BIT_RTS)
 
 BIT_CTS = getattr(termios, "TIOCM_CTS", 0x020)
-BUF_CTS = pack("@I", BIT_CTS)
+BUF_CTS = UINT.pack(BIT_CTS)
+
+# Size of the reusable receive buffer. Larger reads allocate their result directly.
+RECV_BUFFER_SIZE = 4096
+
+# Baudrates with a B<rate> constant in termios
+TERMIOS_BAUDRATES = {
+    int(name[1:]): getattr(termios, name)
+    for name in dir(termios)
+    if name.startswith("B") and name[1:].isdigit()
+}
+
+# Maximum number of buffers for a single writev, at least 16 (_XOPEN_IOV_MAX) if unknown
+IOV_MAX = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in os.sysconf_names else -1
+if IOV_MAX < 1:
+    IOV_MAX = 16
+
+# Raw mode / no echo / binary
+CFLAG_RAW_SET = termios.CLOCAL | termios.CREAD
+LFLAG_RAW_CLEAR = (
+    termios.ICANON
+    | termios.ECHO
+    | termios.ECHOE
+    | termios.ECHOK
+    | termios.ECHONL
+    | termios.ISIG
+    | termios.IEXTEN
+    # Netbsd workaround for Erk
+    | getattr(termios, "ECHOCTL", 0)
+    | getattr(termios, "ECHOKE", 0)
+)
+OFLAG_RAW_CLEAR = termios.OPOST | termios.ONLCR | termios.OCRNL
+IFLAG_RAW_CLEAR = (
+    termios.INLCR
+    | termios.IGNCR
+    | termios.ICRNL
+    | termios.IGNBRK
+    | getattr(termios, "IUCLC", 0)
+    | getattr(termios, "PARMRK", 0)
+)
+
+# XON/XOFF flow control. IXANY is cleared, but never set.
+IFLAG_XONXOFF = termios.IXON | termios.IXOFF
+IFLAG_XONXOFF_CLEAR = IFLAG_XONXOFF | getattr(termios, "IXANY", 0)
+
+# RTS/CTS flow control, try it with alternate constant name. 0 if unsupported.
+CFLAG_RTSCTS = getattr(termios, "CRTSCTS", getattr(termios, "CNEW_RTSCTS", 0))
+
+# There is no POSIX support for 1.5 stop bits, use the same as for two.
+STOPBITS_FLAGS = {
+    StopBits.ONE: 0,
+    StopBits.ONE_POINT_FIVE: termios.CSTOPB,
+    StopBits.TWO: termios.CSTOPB,
+}
+
+
+def parity_flags(cmspar: int) -> Dict[Parity, int]:
+    """
+    Build the mapping from parity to termios cflag bits.
+
+    Args:
+        cmspar: Flag for "stick" (mark/space) parity, or 0 if unsupported
+
+    Returns:
+        cflag bits for each supported parity
+    """
+    flags = {
+        Parity.NONE: 0,
+        Parity.EVEN: termios.PARENB,
+        Parity.ODD: termios.PARENB | termios.PARODD,
+    }
+    if cmspar:
+        flags[Parity.MARK] = termios.PARENB | cmspar | termios.PARODD
+        flags[Parity.SPACE] = termios.PARENB | cmspar
+    return flags
 
 
 class PosixSerialStream(AbstractSerialStream):
@@ -46,15 +124,44 @@ class PosixSerialStream(AbstractSerialStream):
     # paritiy settings for MARK and SPACE
     CMSPAR = 0
 
+    # Mapping from parity to cflag bits. Rebuilt for sub classes which set CMSPAR.
+    PARITY_FLAGS: Dict[Parity, int] = parity_flags(CMSPAR)
+
     # Mapping from baudrates to system constants. Overidden by sub classes.
     BAUDRATE_CONSTANTS: Dict[int, int] = {}
 
+    # Mapping from baudrates to speed values, built from termios and BAUDRATE_CONSTANTS.
+    BAUDRATE_SPEEDS: Dict[int, int] = TERMIOS_BAUDRATES
+
+    # Baudrates missing from the constants may be passed in as literal values.
+    LITERAL_BAUDRATES: bool = False
+
     # File descriptor for the serial device. `None` iff closed.
     _fd: Optional[int] = None
 
+    # Closes the file descriptor if the stream is garbage collected while open.
+    _finalizer: Optional[weakref.finalize] = None
+
     # Hang up on last close.
     _hangup_on_close: bool = True
 
+    # Whether the port is currently flock()ed. `None` if unknown.
+    _locked: Optional[bool] = None
+
+    # Settings applied by the last _reconfigure_port. `None` if not configured.
+    _applied_config: Optional[Tuple[Any, ...]] = None
+
+    # Receive buffer for reads up to RECV_BUFFER_SIZE bytes, allocated on first use.
+    _recv_buffer: Optional[memoryview] = None
+
+    # Whether the last read filled its buffer, so more data is likely queued.
+    _recv_backlog: bool = False
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.PARITY_FLAGS = parity_flags(cls.CMSPAR)
+        cls.BAUDRATE_SPEEDS = {**cls.BAUDRATE_CONSTANTS, **TERMIOS_BAUDRATES}
+
     @property
     def fd(self) -> int:
         """
@@ -81,7 +188,17 @@ class PosixSerialStream(AbstractSerialStream):
         if self._fd is not None:
             raise Exception("Already opened")
 
-        self._fd = os.open(self._port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        # Opening a port can block for a while, e.g. while a USB adapter's driver sets it up.
+        fd = await trio.to_thread.run_sync(
+            os.open, self._port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK
+        )
+        if self._fd is not None:
+            os.close(fd)
+            raise Exception("Already opened")
+
+        self._fd = fd
+        # Must not reference self, or the stream would never be collected.
+        self._finalizer = weakref.finalize(self, os.close, self._fd)
         try:
             self._reconfigure_port(force_update=True)
         except BaseException:
@@ -102,9 +219,12 @@ class PosixSerialStream(AbstractSerialStream):
 
         fd = self._fd
         self._fd = None
+        self._applied_config = None
+        self._locked = None
+        if self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
         try:
-            # If the destructor is run this flag isn't required, because there cannot be
-            # any waiting tasks; if there were, the destructor wouldn't run.
             if notify_closing:
                 trio.lowlevel.notify_closing(fd)
         finally:
@@ -131,7 +251,7 @@ class PosixSerialStream(AbstractSerialStream):
         """
         termios.tcsendbreak(self.fd, int(duration / 0.25))
 
-    async def _send(self, data: memoryview) -> int:
+    async def _send(self, data: ByteString) -> int:
         """
         Send :py:obj:`data` to the serial port. Partial writes are allowed.
 
@@ -143,6 +263,19 @@ class PosixSerialStream(AbstractSerialStream):
         """
         return os.write(self.fd, data)
 
+    async def _sendv(self, buffers: Sequence[ByteString]) -> int:
+        """
+        Send several buffers to the serial port with one system call.
+        Partial writes are allowed.
+
+        Args:
+            buffers: Bytes to write, in order.
+
+        Returns:
+            Number of bytes actually written.
+        """
+        return os.writev(self.fd, buffers[:IOV_MAX])
+
     async def _wait_writable(self) -> None:
         """
         Wait until serial port is writable.
@@ -156,8 +289,66 @@ class PosixSerialStream(AbstractSerialStream):
         Returns:
             Received data
         """
-        await trio.lowlevel.wait_readable(self.fd)
-        return os.read(self.fd, max_bytes or 4096)
+        size = max_bytes or RECV_BUFFER_SIZE
+        if await self._wait_readable() >= size or size > RECV_BUFFER_SIZE:
+            # Either the result will be full, so let os.read allocate it and skip the copy,
+            # or the request is too large to keep a buffer of that size around.
+            data = os.read(self.fd, size)
+            self._recv_backlog = len(data) == size
+            return data
+
+        buf = self._recv_buffer
+        if buf is None:
+            buf = self._recv_buffer = memoryview(bytearray(RECV_BUFFER_SIZE))
+
+        count = os.readv(self.fd, [buf if size == RECV_BUFFER_SIZE else buf[:size]])
+        self._recv_backlog = count == size
+        return buf[:count].tobytes()
+
+    async def _recv_into(self, buffer: WritableBuffer) -> int:
+        """
+        Retrieve up to ``len(buffer)`` bytes from the serial port into :py:obj:`buffer`.
+
+        Returns:
+            Number of bytes received
+        """
+        await self._wait_readable()
+        count = os.readv(self.fd, [buffer])
+        self._recv_backlog = count == len(buffer)
+        return count
+
+    async def _wait_readable(self) -> int:
+        """
+        Wait until serial port is readable.
+
+        Returns:
+            Number of bytes queued in the kernel's receive buffer, 0 if unknown
+        """
+        # Only ask for the queued count after a read that filled its buffer. Otherwise the
+        # port is most likely idle, and the ioctl would only add a syscall to the receive.
+        queued = self._in_waiting() if self._recv_backlog else 0
+
+        # A read with nothing queued returns 0 bytes (VMIN=0, VTIME=0), same as End-of-file.
+        # So only skip waiting if the kernel reports queued data.
+        if queued:
+            await trio.lowlevel.checkpoint()
+        else:
+            await trio.lowlevel.wait_readable(self.fd)
+        return queued
+
+    def _in_waiting(self) -> int:
+        """
+        Get number of bytes queued in the kernel's receive buffer.
+
+        Returns:
+            Number of bytes, 0 if unknown
+        """
+        try:
+            (count,) = UINT.unpack(fcntl.ioctl(self.fd, FIONREAD, BUF_ZERO))
+        except OSError:
+            # E.g. the port is gone. Let the read report it.
+            return 0
+        return count
 
     async def get_cts(self) -> bool:
         """
@@ -177,6 +368,16 @@ class PosixSerialStream(AbstractSerialStream):
         """
         return self._get_bit(BIT_RTS)
 
+    async def get_cts_rts(self) -> Tuple[bool, bool]:
+        """
+        Retrieve current *Clear To Send* and *Ready To Send* states with a single ioctl.
+
+        Returns:
+            Current CTS and RTS states
+        """
+        bits = self._get_modem_bits()
+        return bool(bits & BIT_CTS), bool(bits & BIT_RTS)
+
     async def set_rts(self, value: bool) -> None:
         """
         Set *Ready To Send* state.
@@ -230,9 +431,17 @@ class PosixSerialStream(AbstractSerialStream):
         Returns:
             Current state
         """
-        buf = fcntl.ioctl(self.fd, TIOCMGET, BUF_ZERO)
-        value = unpack("@I", buf)[0]
-        return bool(value & bit)
+        return bool(self._get_modem_bits() & bit)
+
+    def _get_modem_bits(self) -> int:
+        """
+        Get all modem bits with a single ioctl.
+
+        Returns:
+            Current modem bits, to be tested against the ``BIT_*`` constants
+        """
+        (value,) = UINT.unpack(fcntl.ioctl(self.fd, TIOCMGET, BUF_ZERO))
+        return value
 
     def _reconfigure_port(self, force_update: bool = False) -> None:
         """
@@ -247,53 +456,50 @@ class PosixSerialStream(AbstractSerialStream):
             # Don't try to configure a closed port. Next aopen will configure it.
             return
 
-        # Lock port
-        if self._exclusive:
-            try:
-                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
-            except IOError as ex:
-                raise IOError(f"Could not exclusively lock port {self._port!r}: {ex!s}") from ex
-        else:
-            fcntl.flock(fd, fcntl.LOCK_UN)
+        config = (
+            self._exclusive,
+            self._baudrate,
+            self._bytesize,
+            self._parity,
+            self._stopbits,
+            self._xonxoff,
+            self._rtscts,
+            self._hangup_on_close,
+        )
+        if not force_update and config == self._applied_config:
+            return
+
+        # Lock port, unless it already is in the requested state
+        if self._exclusive != self._locked:
+            if self._exclusive:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError as ex:
+                    raise IOError(
+                        f"Could not exclusively lock port {self._port!r}: {ex!s}"
+                    ) from ex
+            else:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._locked = self._exclusive
 
         # Retrieve current attributes
         orig_attr = termios.tcgetattr(fd)
         iflag, oflag, cflag, lflag, ispeed, ospeed, cc = orig_attr
 
         # Set up raw mode / no echo / binary
-        cflag |= termios.CLOCAL | termios.CREAD
-        lflag &= ~(
-            termios.ICANON
-            | termios.ECHO
-            | termios.ECHOE
-            | termios.ECHOK
-            | termios.ECHONL
-            | termios.ISIG
-            | termios.IEXTEN
-        )
-
-        # Netbsd workaround for Erk
-        for flag in ("ECHOCTL", "ECHOKE"):
-            if hasattr(termios, flag):
-                lflag &= ~getattr(termios, flag)
-
-        oflag &= ~(termios.OPOST | termios.ONLCR | termios.OCRNL)
-        iflag &= ~(termios.INLCR | termios.IGNCR | termios.ICRNL | termios.IGNBRK)
-
-        if hasattr(termios, "IUCLC"):
-            iflag &= ~termios.IUCLC
-
-        if hasattr(termios, "PARMRK"):
-            iflag &= ~termios.PARMRK
+        cflag |= CFLAG_RAW_SET
+        lflag &= ~LFLAG_RAW_CLEAR
+        oflag &= ~OFLAG_RAW_CLEAR
+        iflag &= ~IFLAG_RAW_CLEAR
 
         # Setup baud rate
         custom_baud = False
         try:
-            ispeed = ospeed = getattr(termios, f"B{self._baudrate}")
-        except AttributeError:
-            try:
-                ispeed = ospeed = self.BAUDRATE_CONSTANTS[self._baudrate]
-            except KeyError:
+            ispeed = ospeed = self.BAUDRATE_SPEEDS[self._baudrate]
+        except KeyError:
+            if self.LITERAL_BAUDRATES:
+                ispeed = ospeed = self._baudrate
+            else:
                 # See if BOTHER is defined for this platform; if it is, use
                 # this for a speed not defined in the baudrate constants list.
                 try:
@@ -312,57 +518,30 @@ class PosixSerialStream(AbstractSerialStream):
             raise ValueError(f"Invalid char len: {self._bytesize}") from ex
 
         # Setup stop bits
-        if self._stopbits == StopBits.ONE:
-            cflag &= ~termios.CSTOPB
-        elif self._stopbits == StopBits.ONE_POINT_FIVE:
-            # XXX same as TWO.. there is no POSIX support for 1.5
-            cflag |= termios.CSTOPB
-        elif self._stopbits == StopBits.TWO:
-            cflag |= termios.CSTOPB
-        else:
-            raise ValueError(f"Invalid stop bit specification: {self._stopbits}")
+        try:
+            cflag = cflag & ~termios.CSTOPB | STOPBITS_FLAGS[self._stopbits]
+        except KeyError as ex:
+            raise ValueError(f"Invalid stop bit specification: {self._stopbits}") from ex
 
         # Setup parity
         iflag &= ~(termios.INPCK | termios.ISTRIP)
-        if self._parity == Parity.NONE:
-            cflag &= ~(termios.PARENB | termios.PARODD | self.CMSPAR)
-        elif self._parity == Parity.EVEN:
-            cflag &= ~(termios.PARODD | self.CMSPAR)
-            cflag |= termios.PARENB
-        elif self._parity == Parity.ODD:
-            cflag &= ~self.CMSPAR
-            cflag |= termios.PARENB | termios.PARODD
-        elif self._parity == Parity.MARK and self.CMSPAR:
-            cflag |= termios.PARENB | self.CMSPAR | termios.PARODD
-        elif self._parity == Parity.SPACE and self.CMSPAR:
-            cflag |= termios.PARENB | self.CMSPAR
-            cflag &= ~(termios.PARODD)
-        else:
-            raise ValueError(f"Invalid parity: {self._parity}")
+        try:
+            parity = self.PARITY_FLAGS[self._parity]
+        except KeyError as ex:
+            raise ValueError(f"Invalid parity: {self._parity}") from ex
+        cflag = cflag & ~(termios.PARENB | termios.PARODD | self.CMSPAR) | parity
 
         # Setup XON/XOFF flow control
-        if hasattr(termios, "IXANY"):
-            if self._xonxoff:
-                iflag |= termios.IXON | termios.IXOFF  # |termios.IXANY)
-            else:
-                iflag &= ~(termios.IXON | termios.IXOFF | termios.IXANY)
+        if self._xonxoff:
+            iflag |= IFLAG_XONXOFF
         else:
-            if self._xonxoff:
-                iflag |= termios.IXON | termios.IXOFF
-            else:
-                iflag &= ~(termios.IXON | termios.IXOFF)
+            iflag &= ~IFLAG_XONXOFF_CLEAR
 
         # Setup RTS/CTS flow control
-        if hasattr(termios, "CRTSCTS"):
-            if self._rtscts:
-                cflag |= termios.CRTSCTS
-            else:
-                cflag &= ~(termios.CRTSCTS)
-        elif hasattr(termios, "CNEW_RTSCTS"):  # try it with alternate constant name
-            if self._rtscts:
-                cflag |= termios.CNEW_RTSCTS
-            else:
-                cflag &= ~(termios.CNEW_RTSCTS)
+        if self._rtscts:
+            cflag |= CFLAG_RTSCTS
+        else:
+            cflag &= ~CFLAG_RTSCTS
 
         # Setup Hangup on Close
         if self._hangup_on_close:
@@ -370,19 +549,23 @@ class PosixSerialStream(AbstractSerialStream):
         else:
             cflag &= ~termios.HUPCL
 
-        # Use nonblocking operations with no buffers
+        # Use nonblocking operations with no buffers. cc is shared with orig_attr and
+        # modified in place, so check for changes first.
+        cc_changed = cc[termios.VMIN] != 0 or cc[termios.VTIME] != 0
         cc[termios.VMIN] = 0
         cc[termios.VTIME] = 0
 
         new_attr = [iflag, oflag, cflag, lflag, ispeed, ospeed, cc]
 
-        if force_update or new_attr != orig_attr:
+        if force_update or cc_changed or new_attr[:6] != orig_attr[:6]:
             termios.tcsetattr(fd, termios.TCSANOW, new_attr)
 
         # apply custom baud rate, if any
         if custom_baud:
             self._set_special_baudrate(fd)
 
+        self._applied_config = config
+
     def _set_special_baudrate(self, fd: int) -> None:
         """
         Implemented by sub classes
@@ -0,0 +1,427 @@
+import array
+import fcntl
+import functools
+import gc
+import os
+import pty
+import sys
+import termios
+
+import pytest
+import trio
+import trio.testing
+
+from trio_serial import SerialStream
+from trio_serial.abstract import AbstractSerialStream
+from trio_serial.posix import BIT_CTS, BIT_RTS, IOV_MAX, TIOCMGET, UINT
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs Linux pty")
+
+
+@pytest.fixture
+def port():
+    master, slave = pty.openpty()
+    yield master, os.ttyname(slave)
+    os.close(master)
+    os.close(slave)
+
+
+async def read_exactly(fd, count):
+    data = bytearray()
+    while len(data) < count:
+        await trio.lowlevel.wait_readable(fd)
+        data += os.read(fd, count - len(data))
+    return bytes(data)
+
+
+async def wait_queued(stream):
+    while not stream._in_waiting():
+        await trio.sleep(0.001)
+
+
+def test_receive_probes_after_full_read(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            probes = 0
+            in_waiting = stream._in_waiting
+
+            def record_in_waiting():
+                nonlocal probes
+                probes += 1
+                return in_waiting()
+
+            os.write(master, b"abc")
+            await wait_queued(stream)
+            stream._in_waiting = record_in_waiting
+
+            # Nothing read yet, so no backlog is expected
+            assert await stream.receive_some(2) == b"ab"
+            assert probes == 0
+
+            # The last read was full, look for more
+            assert await stream.receive_some(2) == b"c"
+            assert probes == 1
+
+            # The last read was short, just wait
+            os.write(master, b"d")
+            assert await stream.receive_some(2) == b"d"
+            assert probes == 1
+
+    trio.run(main)
+
+
+def test_receive_into(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            os.write(master, b"abcdef")
+            await wait_queued(stream)
+
+            buf = bytearray(4)
+            assert await stream.receive_into(buf) == 4
+            assert buf == b"abcd"
+
+            assert await stream.receive_into(memoryview(buf)[1:]) == 2
+            assert buf == b"aefd"
+
+    trio.run(main)
+
+
+def test_receive_into_empty(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            with pytest.raises(ValueError):
+                await stream.receive_into(bytearray())
+
+    trio.run(main)
+
+
+def test_receive_into_items(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            os.write(master, b"abcdef")
+            await wait_queued(stream)
+
+            # Two items, four bytes
+            buf = array.array("H", [0, 0])
+            assert await stream.receive_into(memoryview(buf)) == 4
+            assert buf.tobytes() == b"abcd"
+
+            with pytest.raises(TypeError):
+                await stream.receive_into(memoryview(b"xy"))
+
+    trio.run(main)
+
+
+def test_receive_into_busy(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(stream.receive_some)
+                await trio.testing.wait_all_tasks_blocked()
+                with pytest.raises(trio.BusyResourceError):
+                    await stream.receive_into(bytearray(4))
+                os.write(master, b"x")
+
+    trio.run(main)
+
+
+def test_receive_into_closed(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+
+            async def receive():
+                with pytest.raises(trio.ClosedResourceError):
+                    await stream.receive_into(bytearray(4))
+
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(receive)
+                await trio.testing.wait_all_tasks_blocked()
+                await stream.aclose()
+
+    trio.run(main)
+
+
+def test_receive_into_fallback(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            os.write(master, b"xyz")
+            await wait_queued(stream)
+
+            buf = bytearray(8)
+            count = await AbstractSerialStream._recv_into(stream, buf)
+            assert buf[:count] == b"xyz"
+
+            # Through receive_into, which hands the fallback a byte view
+            os.write(master, b"abcd")
+            await wait_queued(stream)
+            stream._recv_into = functools.partial(AbstractSerialStream._recv_into, stream)
+            buf = array.array("H", [0, 0])
+            assert await stream.receive_into(memoryview(buf)) == 4
+            assert buf.tobytes() == b"abcd"
+
+    trio.run(main)
+
+
+def test_send_many(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            await stream.send_many([b"ab", bytearray(b"cd"), memoryview(b"ef")])
+            assert await read_exactly(master, 6) == b"abcdef"
+
+    trio.run(main)
+
+
+def test_send_many_empty(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            await stream.send_many([b"", b"ab", bytearray(), b"c"])
+            assert await read_exactly(master, 3) == b"abc"
+
+            for fragments in [[], [b"", memoryview(b"")]]:
+                # Still a checkpoint
+                with trio.CancelScope() as scope:
+                    scope.cancel()
+                    await stream.send_many(fragments)
+                assert scope.cancelled_caught
+
+    trio.run(main)
+
+
+def test_send_many_partial(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            fragments = [bytes([i]) * 50001 for i in range(10)]
+            data = b"".join(fragments)
+            boundaries = {sum(map(len, fragments[:i])) for i in range(len(fragments) + 1)}
+            positions = []
+            sendv = stream._sendv
+
+            async def record_sendv(buffers):
+                sent = await sendv(buffers)
+                positions.append(sent + (positions[-1] if positions else 0))
+                return sent
+
+            stream._sendv = record_sendv
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(stream.send_many, fragments)
+                assert await read_exactly(master, len(data)) == data
+
+            # The output queue of the pty is small, at least one write ended within a fragment.
+            assert any(pos not in boundaries for pos in positions)
+
+    trio.run(main)
+
+
+def test_send_many_releases_buffers(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            calls = 0
+
+            async def failing_sendv(buffers):
+                nonlocal calls
+                calls += 1
+                if calls == 1:
+                    return 1
+                raise trio.ClosedResourceError
+
+            stream._sendv = failing_sendv
+            data = bytearray(b"abc")
+            try:
+                await stream.send_many([data, bytearray(b"def")])
+            except trio.ClosedResourceError:
+                # Would raise BufferError if send_many still held a view of data.
+                data.extend(b"ghi")
+            else:
+                pytest.fail("send_many did not raise")
+            assert data == b"abcghi"
+
+    trio.run(main)
+
+
+def test_send_many_iov_max(port, monkeypatch):
+    master, name = port
+    counts = []
+    writev = os.writev
+
+    def record_writev(fd, buffers):
+        counts.append(len(buffers))
+        return writev(fd, buffers)
+
+    monkeypatch.setattr(os, "writev", record_writev)
+
+    async def main():
+        async with SerialStream(name) as stream:
+            fragments = [bytes([i % 256]) for i in range(IOV_MAX + 10)]
+            await stream.send_many(fragments)
+            assert await read_exactly(master, len(fragments)) == b"".join(fragments)
+
+    trio.run(main)
+    assert counts[0] == IOV_MAX
+    assert max(counts) <= IOV_MAX
+
+
+def test_send_many_fallback(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            assert await AbstractSerialStream._sendv(stream, [b"ab", b"cd"]) == 2
+            assert await read_exactly(master, 2) == b"ab"
+
+            stream._sendv = functools.partial(AbstractSerialStream._sendv, stream)
+            await stream.send_many([b"ab", bytearray(b"cd"), memoryview(b"ef")])
+            assert await read_exactly(master, 6) == b"abcdef"
+
+    trio.run(main)
+
+
+def test_get_cts_rts(port, monkeypatch):
+    master, name = port
+    calls = []
+    ioctl = fcntl.ioctl
+
+    # A pty has no modem lines, fake them.
+    def fake_ioctl(fd, request, arg=0, *args):
+        if request != TIOCMGET:
+            return ioctl(fd, request, arg, *args)
+        calls.append(request)
+        return UINT.pack(modem_bits)
+
+    monkeypatch.setattr(fcntl, "ioctl", fake_ioctl)
+
+    async def main():
+        nonlocal modem_bits
+        async with SerialStream(name) as stream:
+            for modem_bits, expected in [
+                (0, (False, False)),
+                (BIT_CTS, (True, False)),
+                (BIT_RTS, (False, True)),
+                (BIT_CTS | BIT_RTS, (True, True)),
+            ]:
+                calls.clear()
+                assert await stream.get_cts_rts() == expected
+                assert len(calls) == 1
+
+                # Base class default reads the lines one by one
+                assert await AbstractSerialStream.get_cts_rts(stream) == expected
+                assert len(calls) == 3
+
+    modem_bits = 0
+    trio.run(main)
+
+
+def test_leaked_port_closed(port):
+    master, name = port
+
+    async def main():
+        stream = SerialStream(name)
+        await stream.aopen()
+        return stream.fd
+
+    fd = trio.run(main)
+    gc.collect()
+    with pytest.raises(OSError):
+        os.fstat(fd)
+
+
+def test_reconfigure_restores_vmin(port):
+    master, name = port
+
+    async def main():
+        async with SerialStream(name) as stream:
+            attrs = termios.tcgetattr(stream.fd)
+            attrs[6][termios.VMIN] = 1
+            termios.tcsetattr(stream.fd, termios.TCSANOW, attrs)
+
+            # Settings were changed behind the stream's back; forget what was applied.
+            stream._applied_config = None
+            stream._reconfigure_port()
+            assert termios.tcgetattr(stream.fd)[6][termios.VMIN] == 0
+
+    trio.run(main)
+
+
+def test_reconfigure_cached(port, monkeypatch):
+    master, name = port
+    calls = []
+    tcsetattr = termios.tcsetattr
+
+    def record_tcsetattr(fd, when, attributes):
+        calls.append(attributes)
+        tcsetattr(fd, when, attributes)
+
+    monkeypatch.setattr(termios, "tcsetattr", record_tcsetattr)
+
+    async def main():
+        stream = SerialStream(name)
+        await stream.aopen()
+        assert calls
+
+        calls.clear()
+        await stream.set_hangup(await stream.get_hangup())
+        assert not calls
+
+        await stream.set_hangup(False)
+        assert len(calls) == 1
+        assert not calls[0][2] & termios.HUPCL
+
+        # Reopening configures the port again, even though nothing changed.
+        calls.clear()
+        await stream.aclose()
+        await stream.aopen()
+        assert calls
+        await stream.aclose()
+
+    trio.run(main)
+
+
+def test_lock_cached(port, monkeypatch):
+    master, name = port
+    calls = []
+    flock = fcntl.flock
+
+    def record_flock(fd, operation):
+        calls.append(operation)
+        flock(fd, operation)
+
+    monkeypatch.setattr(fcntl, "flock", record_flock)
+
+    async def main():
+        stream = SerialStream(name, exclusive=True)
+        await stream.aopen()
+        assert calls == [fcntl.LOCK_EX | fcntl.LOCK_NB]
+
+        calls.clear()
+        await stream.set_hangup(await stream.get_hangup())
+        await stream.set_hangup(False)
+        assert not calls
+
+        # The lock is gone with the closed fd, reopening must lock again.
+        await stream.aclose()
+        await stream.aopen()
+        assert calls == [fcntl.LOCK_EX | fcntl.LOCK_NB]
+        await stream.aclose()
+
+    trio.run(main)